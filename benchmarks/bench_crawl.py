@@ -0,0 +1,190 @@
+#encoding: utf-8
+""" offline crawl benchmark against a synthetic local website.
+
+usage:
+    $ python benchmarks/bench_crawl.py --page-count 500 --fanout 5 --modes bfs dfs --output bench.json
+"""
+import os
+import sys
+import json
+import math
+import time
+import queue
+import logging
+import argparse
+import platform
+import resource
+import tempfile
+import multiprocessing
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_site import SiteGraph, SyntheticSite
+
+
+# benchmark mode name => keyword arguments of WebCrawler.start,
+# and optional WebCrawler.set_url_sampler arguments
+MODES = OrderedDict([
+    ('bfs', {'crawl_mode': 'BFS'}),
+    ('dfs', {'crawl_mode': 'DFS'}),
+    ('bfs-sampled', {'crawl_mode': 'BFS', 'url_sampler': [3, False]}),
+    ('priority', {'crawl_mode': 'PRIORITY'}),
+])
+
+
+def percentile(values, percent):
+    """ nearest-rank percentile of values, None if values is empty.
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    rank = int(math.ceil(percent / 100.0 * len(values))) - 1
+    return values[min(max(rank, 0), len(values) - 1)]
+
+
+def _run_mode(mode, seed_url, options, result_queue):
+    """ run one crawl in a fresh process, so that RSS and CPU time are not shared between modes.
+    """
+    from webcrawler import __version__
+    from webcrawler.core import WebCrawler
+
+    logging.basicConfig(level=logging.WARNING)
+    logs_folder = tempfile.mkdtemp(prefix='webcrawler-bench-')
+    web_crawler = WebCrawler(seed_url, [], logs_folder, options['config_file'])
+
+    start_kwargs = dict(MODES[mode])
+    url_sampler_args = start_kwargs.pop('url_sampler', None)
+    if url_sampler_args:
+        web_crawler.set_url_sampler(*url_sampler_args)
+    if web_crawler.dns_cache_ttl:
+        # same as command line
+        web_crawler.enable_dns_cache(web_crawler.dns_cache_ttl)
+    start_kwargs.setdefault('max_depth', options['max_depth'])
+    start_kwargs.setdefault('concurrency', options['concurrency'])
+
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    start_time = time.time()
+    web_crawler.start(**start_kwargs)
+    elapsed_time = time.time() - start_time
+    usage_after = resource.getrusage(resource.RUSAGE_SELF)
+
+    visited_urls = web_crawler.url_queue.get_visited_urls()
+    durations = [res['duration_time'] for res in visited_urls.values()]
+    urls_count = len(visited_urls)
+    cpu_time = (usage_after.ru_utime - usage_before.ru_utime) \
+        + (usage_after.ru_stime - usage_before.ru_stime)
+
+    result_queue.put(OrderedDict([
+        ('mode', mode),
+        ('webcrawler_version', __version__),
+        ('start_kwargs', start_kwargs),
+        ('url_sampler', url_sampler_args),
+        ('urls', urls_count),
+        ('elapsed_seconds', round(elapsed_time, 4)),
+        ('urls_per_second', round(urls_count / elapsed_time, 2) if elapsed_time else None),
+        ('latency_p50_ms', round(percentile(durations, 50) * 1000, 3) if durations else None),
+        ('latency_p99_ms', round(percentile(durations, 99) * 1000, 3) if durations else None),
+        ('cpu_seconds', round(cpu_time, 4)),
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        ('peak_rss_kb', usage_after.ru_maxrss // 1024 if sys.platform == 'darwin' else usage_after.ru_maxrss),
+        ('status_codes', OrderedDict(
+            (status_code, len(urls)) for status_code, urls in web_crawler.get_sorted_categorised_urls()
+        )),
+    ]))
+
+
+def run_mode(mode, seed_url, options):
+    """ run mode in a child process, raise RuntimeError if the child process fails.
+    """
+    result_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=_run_mode, args=(mode, seed_url, options, result_queue))
+    process.start()
+
+    result = None
+    while result is None:
+        try:
+            result = result_queue.get(timeout=1)
+        except queue.Empty:
+            if not process.is_alive():
+                # result may be sent right before the child process exits
+                try:
+                    result = result_queue.get(timeout=1)
+                except queue.Empty:
+                    pass
+                break
+
+    process.join()
+    if process.exitcode != 0 or result is None:
+        raise RuntimeError(
+            "benchmark mode {} failed, child process exit code: {}".format(mode, process.exitcode))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark WebCrawler against a synthetic local website.')
+    parser.add_argument('--modes', nargs='+', default=list(MODES.keys()), choices=list(MODES.keys()),
+                        help="Specify crawl modes to benchmark, default is all modes.")
+    parser.add_argument('--rounds', type=int, default=1,
+                        help="Specify how many times each mode is run.")
+    parser.add_argument('--page-count', type=int, default=200, help="Specify max html pages number.")
+    parser.add_argument('--fanout', type=int, default=5, help="Specify child pages linked from each page.")
+    parser.add_argument('--depth', type=int, default=4, help="Specify depth of the site tree.")
+    parser.add_argument('--broken-ratio', type=float, default=0.0,
+                        help="Specify ratio of links returning 404. Each broken link costs \
+                              about 12s of retry backoff in the crawler.")
+    parser.add_argument('--slow-ratio', type=float, default=0.05, help="Specify ratio of slow pages.")
+    parser.add_argument('--slow-delay', type=float, default=0.2, help="Specify slow pages delay in seconds.")
+    parser.add_argument('--head-reject-ratio', type=float, default=0.1,
+                        help="Specify ratio of static assets returning 404 for HEAD requests.")
+    parser.add_argument('--assets-per-page', type=int, default=2, help="Specify static assets per page.")
+    parser.add_argument('--seed', type=int, default=0, help="Specify random seed of the site graph.")
+    parser.add_argument('--max-depth', type=int, help="Specify crawler max depth, default is site depth + 1.")
+    parser.add_argument('--concurrency', type=int, default=16, help="Specify concurrent workers number.")
+    parser.add_argument('--config-file', help="Specify crawler config file path.")
+    parser.add_argument('--output', help="Specify JSON output file path, default is stdout.")
+    args = parser.parse_args()
+
+    site_graph = SiteGraph(
+        page_count=args.page_count,
+        fanout=args.fanout,
+        depth=args.depth,
+        broken_ratio=args.broken_ratio,
+        slow_ratio=args.slow_ratio,
+        slow_delay=args.slow_delay,
+        head_reject_ratio=args.head_reject_ratio,
+        assets_per_page=args.assets_per_page,
+        seed=args.seed
+    )
+    options = {
+        'max_depth': args.max_depth if args.max_depth is not None else args.depth + 1,
+        'concurrency': args.concurrency,
+        'config_file': args.config_file,
+    }
+
+    results = []
+    with SyntheticSite(site_graph) as site:
+        for _ in range(args.rounds):
+            for mode in args.modes:
+                results.append(run_mode(mode, site.url, options))
+
+    report = OrderedDict([
+        ('timestamp', int(time.time())),
+        ('python', platform.python_version()),
+        ('platform', platform.platform()),
+        ('cpu_count', multiprocessing.cpu_count()),
+        ('site', site_graph.describe()),
+        ('results', results),
+    ])
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+#encoding: utf-8
+""" generate a synthetic website graph and serve it from a local HTTP server.
+"""
+import time
+import random
+import threading
+from collections import OrderedDict
+
+try:
+    # Python3
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    # Python2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+
+ASSET_TYPES = [
+    ('png', 'image/png'),
+    ('css', 'text/css'),
+    ('js', 'application/javascript'),
+]
+
+
+class SiteGraph(object):
+    """ deterministic site graph.
+    @params
+        page_count: max number of html pages, including the root page.
+        fanout: child pages linked from each page.
+        depth: max depth of the page tree, root page is depth 0.
+        broken_ratio: ratio of links pointing to pages which return 404.
+        slow_ratio: ratio of links pointing to pages which respond after slow_delay.
+        head_reject_ratio: ratio of static assets which return 404 for HEAD requests.
+        assets_per_page: static assets (img/link/script) referenced by each page.
+    """
+
+    def __init__(self, page_count=200, fanout=5, depth=4, broken_ratio=0.0,
+                 slow_ratio=0.0, slow_delay=0.2, head_reject_ratio=0.1,
+                 assets_per_page=2, seed=0):
+        self.page_count = page_count
+        self.fanout = fanout
+        self.depth = depth
+        self.broken_ratio = broken_ratio
+        self.slow_ratio = slow_ratio
+        self.slow_delay = slow_delay
+        self.head_reject_ratio = head_reject_ratio
+        self.assets_per_page = assets_per_page
+        self.seed = seed
+
+        # path => list of (tag, href)
+        self.pages = OrderedDict()
+        self.slow_pages = set()
+        self.broken_pages = set()
+        self.assets = {}
+        self.head_reject_assets = set()
+        self._build()
+
+    def _build(self):
+        rand = random.Random(self.seed)
+        self.pages['/'] = []
+        current_level = ['/']
+        page_index = 1
+
+        for _ in range(self.depth):
+            next_level = []
+            for parent in current_level:
+                for _ in range(self.fanout):
+                    if page_index >= self.page_count:
+                        break
+                    roll = rand.random()
+                    if roll < self.broken_ratio:
+                        path = '/broken/{}.html'.format(page_index)
+                        self.broken_pages.add(path)
+                    elif roll < self.broken_ratio + self.slow_ratio:
+                        path = '/slow/{}.html'.format(page_index)
+                        self.slow_pages.add(path)
+                        self.pages[path] = []
+                    else:
+                        path = '/page/{}.html'.format(page_index)
+                        self.pages[path] = []
+                        next_level.append(path)
+                    self.pages[parent].append(('a', path))
+                    page_index += 1
+            current_level = next_level
+
+        # link every page back to the root and a random sibling, and attach static assets
+        all_pages = list(self.pages.keys())
+        asset_index = 0
+        for path, links in self.pages.items():
+            links.append(('a', '/'))
+            links.append(('a', rand.choice(all_pages)))
+            for _ in range(self.assets_per_page):
+                ext, content_type = ASSET_TYPES[asset_index % len(ASSET_TYPES)]
+                if rand.random() < self.head_reject_ratio:
+                    asset_path = '/nohead/{}.{}'.format(asset_index, ext)
+                    self.head_reject_assets.add(asset_path)
+                else:
+                    asset_path = '/static/{}.{}'.format(asset_index, ext)
+                self.assets[asset_path] = content_type
+                tag = {'png': 'img', 'css': 'link', 'js': 'script'}[ext]
+                links.append((tag, asset_path))
+                asset_index += 1
+
+    def get_urls_count(self):
+        return len(self.pages) + len(self.broken_pages) + len(self.assets)
+
+    def render_page(self, path):
+        body = ['<html><head><title>{}</title></head><body>'.format(path)]
+        for tag, href in self.pages[path]:
+            if tag == 'a':
+                body.append('<a href="{0}">{0}</a>'.format(href))
+            elif tag == 'link':
+                body.append('<link rel="stylesheet" href="{}">'.format(href))
+            else:
+                body.append('<{0} src="{1}"></{0}>'.format(tag, href))
+        body.append('</body></html>')
+        return '\n'.join(body).encode('utf-8')
+
+    def describe(self):
+        return OrderedDict([
+            ('page_count', self.page_count),
+            ('fanout', self.fanout),
+            ('depth', self.depth),
+            ('broken_ratio', self.broken_ratio),
+            ('slow_ratio', self.slow_ratio),
+            ('slow_delay', self.slow_delay),
+            ('head_reject_ratio', self.head_reject_ratio),
+            ('assets_per_page', self.assets_per_page),
+            ('seed', self.seed),
+            ('pages', len(self.pages)),
+            ('broken_pages', len(self.broken_pages)),
+            ('slow_pages', len(self.slow_pages)),
+            ('assets', len(self.assets)),
+            ('head_reject_assets', len(self.head_reject_assets)),
+            ('total_urls', self.get_urls_count()),
+        ])
+
+
+def make_handler(site_graph):
+
+    class SyntheticSiteHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _respond(self, status_code, content_type, body, send_body):
+            self.send_response(status_code)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if send_body:
+                self.wfile.write(body)
+
+        def _handle(self, send_body):
+            path = self.path.split('?')[0]
+            if path in site_graph.pages:
+                if path in site_graph.slow_pages:
+                    time.sleep(site_graph.slow_delay)
+                self._respond(200, 'text/html', site_graph.render_page(path), send_body)
+            elif path in site_graph.assets:
+                if not send_body and path in site_graph.head_reject_assets:
+                    # mimic servers which can not handle HEAD method
+                    self._respond(404, 'text/html', b'', send_body)
+                    return
+                self._respond(200, site_graph.assets[path], b'x' * 64, send_body)
+            else:
+                self._respond(404, 'text/html', b'<html>Not Found</html>', send_body)
+
+        def do_HEAD(self):
+            self._handle(send_body=False)
+
+        def do_GET(self):
+            self._handle(send_body=True)
+
+    return SyntheticSiteHandler
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class SyntheticSite(object):
+    """ serve a SiteGraph on 127.0.0.1 in a background thread.
+    """
+
+    def __init__(self, site_graph, host='127.0.0.1', port=0):
+        self.site_graph = site_graph
+        self.server = ThreadingHTTPServer((host, port), make_handler(site_graph))
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return 'http://{}:{}/'.format(host, port)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
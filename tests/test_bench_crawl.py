@@ -0,0 +1,32 @@
+#encoding: utf-8
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from bench_crawl import percentile
+
+
+class TestPercentile(unittest.TestCase):
+
+    def test_nearest_rank(self):
+        cases = [
+            # (values, percent, expected)
+            ([], 50, None),
+            ([5], 0, 5),
+            ([5], 99, 5),
+            ([1, 2], 50, 1),
+            ([2, 1], 51, 2),
+            (list(range(1, 7)), 50, 3),
+            (list(range(1, 101)), 50, 50),
+            (list(range(1, 101)), 99, 99),
+            (list(range(1, 101)), 100, 100),
+            ([0.3, 0.1, 0.2], 0, 0.1),
+        ]
+        for values, percent, expected in cases:
+            self.assertEqual(percentile(values, percent), expected, (values, percent))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+#encoding: utf-8
+import unittest
+
+from webcrawler import helpers
+
+
+class TestCanonicalizeUrlQuery(unittest.TestCase):
+
+    def test_canonicalize_url_query(self):
+        ignore_params_regex = helpers.get_query_params_regex(['utm_*', 'gclid'])
+        cases = [
+            # (url, sort_params, expected)
+            ('http://a.test/p', True, 'http://a.test/p'),
+            ('http://a.test/p?color=white', False, 'http://a.test/p?color=white'),
+            ('http://a.test/p?utm_source=home&color=white', False, 'http://a.test/p?color=white'),
+            ('http://a.test/p?utm_source=home&utm_medium=mail', False, 'http://a.test/p'),
+            ('http://a.test/p?gclid', False, 'http://a.test/p'),
+            ('http://a.test/p?gclid_x=1', False, 'http://a.test/p?gclid_x=1'),
+            # blank params are dropped
+            ('http://a.test/p?&&color=white&', False, 'http://a.test/p?color=white'),
+            ('http://a.test/p?color=&size=', False, 'http://a.test/p?color=&size='),
+            # encoded keys are matched decoded, kept values are not re-encoded
+            ('http://a.test/p?utm%5Fsource=x&q=a%20b', False, 'http://a.test/p?q=a%20b'),
+            ('http://a.test/p?q=a+b&tag=%E4%B8%AD', False, 'http://a.test/p?q=a+b&tag=%E4%B8%AD'),
+            ('http://a.test/p?b=2&a=1', False, 'http://a.test/p?b=2&a=1'),
+            ('http://a.test/p?b=2&a=1', True, 'http://a.test/p?a=1&b=2'),
+            ('http://a.test/p?utm_source=x#top', False, 'http://a.test/p#top'),
+        ]
+        for url, sort_params, expected in cases:
+            self.assertEqual(
+                helpers.canonicalize_url_query(url, ignore_params_regex, sort_params), expected, url)
+
+    def test_no_ignore_params(self):
+        self.assertIsNone(helpers.get_query_params_regex([]))
+        self.assertEqual(
+            helpers.canonicalize_url_query('http://a.test/p?utm_source=x', None),
+            'http://a.test/p?utm_source=x'
+        )
+
+
+class TestUrlTemplate(unittest.TestCase):
+
+    def test_get_url_segment_template(self):
+        cases = [
+            # (segment, expected)
+            ('', ''),
+            ('product', 'product'),
+            ('index.html', 'index.html'),
+            ('123', '<num>'),
+            ('123.html', '<num>.html'),
+            ('2019', '<num>'),
+            ('05', '<num>'),
+            ('3f9a8b7c', '<id>'),
+            ('deadbeef', 'deadbeef'),
+            ('550e8400-e29b-41d4-a716-446655440000', '<id>'),
+            ('about-us', '<slug>'),
+            ('phantom-4-pro', '<slug>'),
+            ('user_profile', '<slug>'),
+            ('sku1234', '<slug>'),
+            ('v2', 'v2'),
+            ('app.3f9a8b7c.js', '<slug>.js'),
+            ('jquery.min.js', '<slug>.js'),
+            ('archive.tar.gz', '<slug>.gz'),
+            # non-alphabetic extension is part of the name
+            ('file.v2', '<slug>'),
+        ]
+        for segment, expected in cases:
+            self.assertEqual(helpers.get_url_segment_template(segment), expected, segment)
+
+    def test_get_url_template(self):
+        cases = [
+            # (url, expected)
+            ('http://a.test/', 'a.test/'),
+            ('http://a.test/2019/05/hello-world', 'a.test/<num>/<num>/<slug>'),
+            ('https://a.test/product/phantom-4-pro?color=white&from=home', 'a.test/product/<slug>?color&from'),
+            ('https://a.test/product/mavic-2-zoom?from=mail&color=', 'a.test/product/<slug>?color&from'),
+            ('http://a.test/static/app.3f9a8b7c.js', 'a.test/static/<slug>.js'),
+            ('http://a.test/page/12.html', 'a.test/page/<num>.html'),
+        ]
+        for url, expected in cases:
+            self.assertEqual(helpers.get_url_template(url), expected, url)
+
+
+if __name__ == '__main__':
+    unittest.main()
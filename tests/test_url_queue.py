@@ -0,0 +1,78 @@
+#encoding: utf-8
+import queue
+import unittest
+
+from webcrawler.url_queue import PriorityUrlQueue
+
+
+def referers_score(url, depth, referers_count):
+    return referers_count - depth
+
+
+def pop_all(frontier):
+    urls = []
+    while True:
+        try:
+            urls.append(frontier.get())
+        except queue.Empty:
+            return urls
+
+
+class TestPriorityUrlQueue(unittest.TestCase):
+
+    def test_get_order(self):
+        cases = [
+            # (description, puts of (url, depth, referer_url), expected pops of (url, depth))
+            ("ties are popped in FIFO order",
+             [('a', 1, None), ('b', 1, None), ('c', 1, None)],
+             [('a', 1), ('b', 1), ('c', 1)]),
+            ("higher score first",
+             [('deep', 3, None), ('shallow', 0, None)],
+             [('shallow', 0), ('deep', 3)]),
+            ("re-put from another referer raises score",
+             [('a', 1, 'r1'), ('b', 1, 'r1'), ('b', 1, 'r2')],
+             [('b', 1), ('a', 1)]),
+            ("re-put from the same referer does not change score",
+             [('a', 1, 'r1'), ('b', 1, 'r1'), ('b', 1, 'r1')],
+             [('a', 1), ('b', 1)]),
+            ("re-put keeps min depth",
+             [('a', 2, None), ('b', 1, None), ('a', 0, None)],
+             [('a', 0), ('b', 1)]),
+            ("re-put with lower score invalidates the higher heap item",
+             [('a', 0, None), ('b', 1, None), ('a', 3, None)],
+             [('a', 0), ('b', 1)]),
+            ("blank urls are ignored",
+             [('', 0, None), (None, 0, None), ('a', 0, None)],
+             [('a', 0)]),
+        ]
+        for description, puts, expected in cases:
+            frontier = PriorityUrlQueue(referers_score)
+            for url, depth, referer_url in puts:
+                frontier.put(url, depth, referer_url)
+            self.assertEqual(frontier.qsize(), len(expected), description)
+            self.assertEqual(pop_all(frontier), expected, description)
+            self.assertTrue(frontier.empty(), description)
+
+    def test_popped_url_is_not_put_again(self):
+        frontier = PriorityUrlQueue(referers_score)
+        frontier.put('a', 0)
+        self.assertEqual(frontier.get(), ('a', 0))
+        frontier.put('a', 0, 'r1')
+        self.assertTrue(frontier.empty())
+        self.assertRaises(queue.Empty, frontier.get)
+
+    def test_score_func_arguments(self):
+        calls = []
+
+        def score_func(url, depth, referers_count):
+            calls.append((url, depth, referers_count))
+            return 0
+
+        frontier = PriorityUrlQueue(score_func)
+        frontier.put('a', 2, 'r1')
+        frontier.put('a', 1, 'r2')
+        self.assertEqual(calls, [('a', 2, 1), ('a', 1, 2)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,6 +10,14 @@ from .helpers import color_logging
 def main():
     """ parse command line options and run commands.
     """
+    # handle version option before building the full parser, so that
+    # optional dependencies like jenkins_mail_py are not imported for it
+    version_parser = argparse.ArgumentParser(add_help=False)
+    version_parser.add_argument('-V', '--version', dest='version', action='store_true')
+    if version_parser.parse_known_args()[0].version:
+        print("WebCrawler version: {}".format(__version__))
+        exit(0)
+
     parser = argparse.ArgumentParser(
         description='A web crawler for testing website links validation.')
 
@@ -22,20 +30,53 @@ def main():
     parser.add_argument(
         '--config-file', help="Specify config file path.")
     parser.add_argument(
-        '--seeds', default='http://debugtalk.com',
+        '--seeds',
         help="Specify crawl seed url(s), several urls can be specified with pipe; \
-              if auth needed, seeds can be specified like user1:pwd1@url1|user2:pwd2@url2")
+              if auth needed, seeds can be specified like user1:pwd1@url1|user2:pwd2@url2; \
+              default is http://debugtalk.com if no sitemap or seeds file is specified.")
+    parser.add_argument(
+        '--sitemap', action='append', default=[],
+        help="Specify sitemap or sitemap index path or url as seeds, gzip supported, \
+              can be specified several times.")
+    parser.add_argument(
+        '--seeds-file', action='append', default=[],
+        help="Specify newline-delimited urls file path or url as seeds, gzip supported, \
+              can be specified several times.")
     parser.add_argument(
         '--include-hosts', help="Specify extra hosts to be crawled.")
     parser.add_argument(
         '--cookies', help="Specify cookies, several cookies can be joined by '|'. \
             e.g. 'lang:en,country:us|lang:zh,country:cn'")
     parser.add_argument(
-        '--crawl-mode', default='BFS', help="Specify crawl mode, BFS or DFS.")
+        '--crawl-mode', default='BFS', help="Specify crawl mode, BFS, DFS or PRIORITY.")
     parser.add_argument(
         '--max-depth', default=5, type=int, help="Specify max crawl depth.")
     parser.add_argument(
         '--concurrency', help="Specify concurrent workers number.")
+    parser.add_argument(
+        '--time-budget', type=float,
+        help="Specify max running seconds, urls are tested in priority order and crawl stops when it runs out.")
+    parser.add_argument(
+        '--max-requests', type=int,
+        help="Specify max tested urls number, urls are tested in priority order and crawl stops when it runs out.")
+    parser.add_argument(
+        '--previous-results',
+        help="Specify visited_urls.yml saved by a previous run, urls failed in it are tested first.")
+    parser.add_argument(
+        '--sample-per-cluster', default=0, type=int,
+        help="Specify representatives number crawled for urls sharing one path template, \
+            default is 0, which disables sampling.")
+    parser.add_argument(
+        '--sample-by-md5', action='store_true',
+        help="Pages with the same content md5 as an earlier representative are not unique in sampling.")
+    parser.add_argument(
+        '--coordinator', help="Run as distributed crawl coordinator listening on the specified address, \
+            e.g. tcp://0.0.0.0:8765 or unix:///tmp/webcrawler.sock")
+    parser.add_argument(
+        '--worker', help="Run as distributed crawl worker connecting to the specified coordinator address.")
+    parser.add_argument(
+        '--batch-size', default=20, type=int,
+        help="Specify max urls number handed out to a distributed worker at a time, default is 20.")
 
     parser.add_argument(
         '--save-results', default='NO', help="Specify if save results, default is NO.")
@@ -55,15 +96,29 @@ def main():
 
     args = parser.parse_args()
 
-    if args.version:
-        print("WebCrawler version: {}".format(__version__))
-        exit(0)
-
     log_level = getattr(logging, args.log_level.upper())
     logging.basicConfig(level=log_level)
     color_logging("args: %s" % args)
 
-    main_crawler(args, mailer)
+    if args.worker:
+        main_worker(args)
+    else:
+        main_crawler(args, mailer)
+
+def main_worker(args):
+    from .distributed import CrawlWorker
+    logs_folder = os.path.join(os.getcwd(), "logs")
+    worker = CrawlWorker(
+        args.worker,
+        logs_folder,
+        args.config_file,
+        args.concurrency,
+        args.batch_size
+    )
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        color_logging("Canceling...", color='red')
 
 def main_crawler(args, mailer=None):
     include_hosts = args.include_hosts.split(',') if args.include_hosts else []
@@ -71,12 +126,54 @@ def main_crawler(args, mailer=None):
     jenkins_build_number = args.jenkins_build_number
     logs_folder = os.path.join(os.getcwd(), "logs", '{}'.format(jenkins_build_number))
 
-    web_crawler = WebCrawler(args.seeds, include_hosts, logs_folder, args.config_file)
+    seed_sources = args.sitemap + args.seeds_file
+    if args.seeds is None:
+        seeds = '' if seed_sources else 'http://debugtalk.com'
+    else:
+        seeds = args.seeds
+
+    web_crawler = WebCrawler(seeds, include_hosts, logs_folder, args.config_file)
+    for sitemap in args.sitemap:
+        web_crawler.add_seed_source(sitemap, 'sitemap')
+    for seeds_file in args.seeds_file:
+        web_crawler.add_seed_source(seeds_file, 'list')
 
     # set grey environment
     if args.grey_user_agent and args.grey_traceid and args.grey_view_grey:
         web_crawler.set_grey_env(args.grey_user_agent, args.grey_traceid, args.grey_view_grey)
 
+    if args.previous_results:
+        web_crawler.load_previous_results(args.previous_results)
+
+    if args.sample_per_cluster > 0:
+        web_crawler.set_url_sampler(args.sample_per_cluster, args.sample_by_md5)
+
+    coordinator = None
+    if args.coordinator:
+        from .distributed import CrawlCoordinator
+        # coordinator crawls in BFS order without budget or sampling
+        ignored_options = [
+            option for option, value in [
+                ('--sitemap', args.sitemap),
+                ('--seeds-file', args.seeds_file),
+                ('--crawl-mode', args.crawl_mode.upper() != 'BFS'),
+                ('--time-budget', args.time_budget),
+                ('--max-requests', args.max_requests),
+                ('--previous-results', args.previous_results),
+                ('--sample-per-cluster', args.sample_per_cluster > 0),
+                ('--concurrency', args.concurrency)
+            ]
+            if value
+        ]
+        if ignored_options:
+            color_logging("{} not supported in distributed mode, ignored.".format(
+                ', '.join(ignored_options)), 'WARNING')
+        coordinator = CrawlCoordinator(web_crawler, args.coordinator, batch_size=args.batch_size)
+        coordinator.serve()
+    elif web_crawler.dns_cache_ttl:
+        # one DNS cache for all cookies runs, workers enable their own in distributed mode
+        web_crawler.enable_dns_cache(web_crawler.dns_cache_ttl)
+
     canceled = False
     try:
         for cookies_str in cookies_list:
@@ -88,20 +185,29 @@ def main_crawler(args, mailer=None):
                 key, value = cookie_str.split(':')
                 cookies[key.strip()] = value.strip()
 
-            web_crawler.start(
-                cookies,
-                args.crawl_mode,
-                args.max_depth,
-                args.concurrency
-            )
+            if coordinator:
+                coordinator.start(cookies, args.max_depth)
+            else:
+                web_crawler.start(
+                    cookies,
+                    args.crawl_mode,
+                    args.max_depth,
+                    args.concurrency,
+                    args.time_budget,
+                    args.max_requests
+                )
 
         if mailer and mailer.config_ready:
-            subject = "%s" % args.seeds
+            subject = "%s" % '|'.join(filter(None, [seeds] + seed_sources))
             mail_content_ordered_dict, flag_code = web_crawler.get_mail_content_ordered_dict()
             mailer.send_mail(subject, mail_content_ordered_dict, flag_code)
     except KeyboardInterrupt:
         canceled = True
         color_logging("Canceling...", color='red')
     finally:
+        if coordinator:
+            coordinator.stop()
+        if web_crawler.dns_cache:
+            web_crawler.disable_dns_cache()
         save_results = False if args.save_results.upper() == "NO" else True
         web_crawler.print_result(canceled, save_results)
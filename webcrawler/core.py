@@ -1,16 +1,16 @@
 import os
+import math
 import time
 import queue
 import re
 import threading
+import itertools
 import copy
 from collections import OrderedDict
-import requests
-import lxml.html
-import multiprocessing
 
 from .helpers import color_logging
-from .url_queue import UrlQueue
+from .url_queue import UrlQueue, PriorityUrlQueue
+from .url_sampler import UrlSampler
 from . import helpers
 
 
@@ -25,6 +25,8 @@ def parse_seeds(seeds):
     seeds = seeds.strip().split('|')
     website_list = []
     for seed in seeds:
+        if not seed:
+            continue
         if '@' not in seed:
             website = {
                 'url': seed,
@@ -43,9 +45,42 @@ def parse_seeds(seeds):
     return website_list
 
 
+def compile_config(config_dict):
+    """ compile parsed YAML config into the settings used by WebCrawler.
+        the result must be JSON serializable, as it is cached by helpers.load_compiled_config.
+    """
+    whitelist_configs = config_dict.get('whitelist', {})
+    canonicalization_configs = config_dict.get('query-canonicalization', {})
+    priority_weights = {
+        'depth': -2,
+        'referers': 1,
+        'include-host': 3,
+        'failed-before': 10
+    }
+    priority_weights.update(config_dict.get('priority-weights', {}))
+    return {
+        'headers': config_dict.get('headers', {}),
+        'url_type_config': config_dict.get('Content-Type', {}),
+        'timeout': config_dict.get('default_timeout', 20),
+        'whitelist_host': whitelist_configs.get('host', []),
+        'whitelist_fullurls': whitelist_configs.get('fullurl', []),
+        'whitelist_include_keys': whitelist_configs.get('include-key', []),
+        'whitelist_startswith_strs': whitelist_configs.get('startswith', []),
+        'canonical_ignore_params': canonicalization_configs.get('ignore-params', []),
+        'canonical_sort_params': canonicalization_configs.get('sort-params', False),
+        'content_fingerprints_limit': config_dict.get('content_fingerprints_limit', 10000),
+        'priority_weights': priority_weights,
+        'dns_cache_ttl': config_dict.get('dns_cache_ttl', 300),
+        'seeds_batch_size': config_dict.get('seeds_batch_size', 1000)
+    }
+
+
 class WebCrawler(object):
 
-    def __init__(self, seeds, include_hosts, logs_folder, config_file=None):
+    def __init__(self, seeds, include_hosts, logs_folder, config_file=None, keep_results=True):
+        """ keep_results: if False, only visited urls are kept for deduplication, and url results are
+                only passed to result callbacks, see add_result_callback and iter_results.
+        """
         self.website_list = parse_seeds(seeds)
         self.include_hosts_set = set(include_hosts)
         self.test_counter = 0
@@ -65,9 +100,32 @@ class WebCrawler(object):
         self.web_urls_mapping = {}
         self.bad_urls_mapping = {}
         self.current_depth_unvisited_urls_queue = queue.Queue()
+        self.url_sampler = None
+        self.dns_cache = None
+        self.seed_sources = []
+        # content md5 => raw hyper links of page, used to skip parsing duplicate pages
+        self.content_links_mapping = OrderedDict()
+        self.content_links_mapping_lock = threading.Lock()
+        self.duplicate_content_counter = 0
+        self.previous_failed_urls = set()
+        self.priority_frontier = None
+        self.priority_condition = threading.Condition()
+        self.prioritized_urls_queue = queue.Queue()
+        self.prioritized_inflight_count = 0
+        self.budget_exhausted = False
+        self.untested_urls_count = 0
+        # True if crawl stopped before all seeds of seed sources were read
+        self.seed_sources_unread = False
+        self.keep_results = keep_results
+        self.result_callbacks = []
+        self.stop_requested = False
 
     def reset_all(self):
         self.current_depth = 0
+        self.budget_exhausted = False
+        self.untested_urls_count = 0
+        self.seed_sources_unread = False
+        self.stop_requested = False
         self.current_depth_unvisited_urls_queue.queue.clear()
         self.url_queue.clear_unvisited_urls()
 
@@ -84,22 +142,30 @@ class WebCrawler(object):
         else:
             config_file = os.path.join(os.path.dirname(__file__), 'default_config.yml')
 
-        config_dict = helpers.load_yaml_file(config_file)
+        # compiled config is shared by the cache, copy it before any modification
+        config = copy.deepcopy(helpers.load_compiled_config(config_file, compile_config))
 
         self.kwargs = {
-            'headers': config_dict.get('headers', {}),
+            'headers': config['headers'],
             'cookies': {}
         }
 
-        self.url_type_config = config_dict.get('Content-Type', {})
+        self.url_type_config = config['url_type_config']
         self.user_agent = self.kwargs["headers"].get('User-Agent', {})
-        self.kwargs['timeout'] = config_dict.get('default_timeout', 20)
+        self.kwargs['timeout'] = config['timeout']
+
+        self.whitelist_host = config['whitelist_host']
+        self.whitelist_fullurls = config['whitelist_fullurls']
+        self.whitelist_include_keys = config['whitelist_include_keys']
+        self.whitelist_startswith_strs = config['whitelist_startswith_strs']
 
-        whitelist_configs = config_dict.get('whitelist', {})
-        self.whitelist_host = whitelist_configs.get('host', [])
-        self.whitelist_fullurls = whitelist_configs.get('fullurl', [])
-        self.whitelist_include_keys = whitelist_configs.get('include-key', [])
-        self.whitelist_startswith_strs = whitelist_configs.get('startswith', [])
+        self.canonical_ignore_params_regex = \
+            helpers.get_query_params_regex(config['canonical_ignore_params'])
+        self.canonical_sort_params = config['canonical_sort_params']
+        self.content_fingerprints_limit = config['content_fingerprints_limit']
+        self.priority_weights = config['priority_weights']
+        self.dns_cache_ttl = config['dns_cache_ttl']
+        self.seeds_batch_size = config['seeds_batch_size']
 
         self.grey_env = False
 
@@ -110,6 +176,103 @@ class WebCrawler(object):
         self.grey_env = True
         self.grey_user_agent = user_agent
 
+    def set_url_sampler(self, sample_per_cluster, sample_by_md5=False):
+        """ only crawl sample_per_cluster representatives of urls sharing one path template.
+        """
+        self.url_sampler = UrlSampler(sample_per_cluster, sample_by_md5)
+
+    def add_seed_source(self, source, source_type='sitemap'):
+        """ add seed urls source, which is streamed and tested at depth 0 when crawling starts.
+        @params
+            source: local file path or url, gzip supported
+            source_type: 'sitemap' for sitemap or sitemap index, 'list' for newline-delimited urls file
+        """
+        self.seed_sources.append((source_type, source))
+
+    def iter_source_seeds(self):
+        """ yield seed urls of seed sources, hosts of seed urls are crawled as included hosts.
+        """
+        from . import seed_sources
+        for source_type, source in self.seed_sources:
+            kwargs = copy.deepcopy(self.kwargs)
+            if not self.grey_env:
+                kwargs['headers']['User-Agent'] = self.get_user_agent_by_url(source)
+            source_host = helpers.get_parsed_object_from_url_without_extra_info(source).netloc
+            if self.auth_dict.get(source_host):
+                kwargs['auth'] = self.auth_dict[source_host]
+
+            if source_type == 'sitemap':
+                # failed sitemaps of sitemap index are reported one by one
+                urls = seed_sources.iter_sitemap_urls(
+                    source, kwargs, error_callback=self.save_seed_source_error)
+            else:
+                urls = seed_sources.iter_url_list(source, kwargs)
+
+            color_logging("Load seeds from {}: {}".format(source_type, source))
+            try:
+                for url in urls:
+                    host = helpers.get_parsed_object_from_url_without_extra_info(url).netloc
+                    self.include_hosts_set.add(host)
+                    yield url
+            except seed_sources.SOURCE_ERRORS as ex:
+                self.save_seed_source_error(source, ex)
+
+    def save_seed_source_error(self, source, ex):
+        color_logging("{}: {}".format(source, str(ex)), 'ERROR')
+        if self.keep_results:
+            self.bad_urls_mapping[source] = str(ex)
+            self.save_categorised_url('SeedSourceError', source)
+
+    def load_previous_results(self, visited_urls_file):
+        """ load visited urls saved by a previous run, urls failed in it are tested first in priority mode.
+        """
+        visited_urls = helpers.load_yaml_file(visited_urls_file) or {}
+        for url, url_test_res in visited_urls.items():
+            status_code = str(url_test_res.get('status_code'))
+            if not status_code.isdigit() or int(status_code) >= 400:
+                self.previous_failed_urls.add(url)
+
+    def enable_dns_cache(self, ttl):
+        """ cache DNS lookups of the whole process with ttl seconds,
+            and prefetch DNS of new hosts when their urls are added to url_queue.
+            socket.getaddrinfo is replaced until disable_dns_cache is called,
+            so it is only enabled by command line, as other threads of the process are affected too.
+        """
+        from .dns_cache import install_dns_cache
+        self.dns_cache = install_dns_cache(ttl)
+        self.url_queue.new_host_callback = self.prefetch_dns
+
+    def disable_dns_cache(self):
+        """ restore socket.getaddrinfo, stats of self.dns_cache are kept for print_result.
+        """
+        from .dns_cache import uninstall_dns_cache
+        uninstall_dns_cache()
+        self.url_queue.new_host_callback = None
+
+    def prefetch_dns(self, parsed_object):
+        try:
+            port = parsed_object.port or {'http': 80, 'https': 443}.get(parsed_object.scheme)
+        except ValueError:
+            # invalid port, reported when the url is requested
+            return
+        if port:
+            self.dns_cache.prefetch(parsed_object.hostname, port)
+
+    def get_url_priority_score(self, url, depth, referers_count):
+        """ score url for priority frontier, urls with higher score are tested first.
+        """
+        weights = self.priority_weights
+        score = weights['depth'] * depth \
+            + weights['referers'] * math.log(1 + referers_count, 2)
+
+        host = helpers.get_parsed_object_from_url(url).netloc
+        if host in self.include_hosts_set:
+            score += weights['include-host']
+        if url in self.previous_failed_urls:
+            score += weights['failed-before']
+
+        return score
+
     def get_user_agent_by_url(self, url):
         if '//m.' in url:
             # e.g. http://m.debugtalk.com
@@ -154,12 +317,16 @@ class WebCrawler(object):
             parsed_url = self.parse_url(url, referer_url)
             if parsed_url is None:
                 continue
+            if self.canonical_ignore_params_regex or self.canonical_sort_params:
+                parsed_url = helpers.canonicalize_url_query(
+                    parsed_url, self.canonical_ignore_params_regex, self.canonical_sort_params)
             parsed_urls_set.add(parsed_url)
         return parsed_urls_set
 
-    def parse_page_links(self, referer_url, content):
-        """ parse a web pages and get all hyper links.
+    def get_page_raw_links(self, content):
+        """ parse a web page and get all raw hyper links, as they are in page.
         """
+        import lxml.html
         raw_links_set = set()
 
         try:
@@ -175,6 +342,27 @@ class WebCrawler(object):
 
             raw_links_set.add(url)
 
+        return raw_links_set
+
+    def parse_page_links(self, referer_url, content, content_md5=None):
+        """ parse a web pages and get all hyper links.
+            if a page with the same content md5 has been parsed, its raw hyper links are reused.
+        """
+        raw_links_set = None
+        if content_md5 is not None:
+            raw_links_set = self.content_links_mapping.get(content_md5)
+
+        if raw_links_set is None:
+            raw_links_set = self.get_page_raw_links(content)
+            if content_md5 is not None:
+                with self.content_links_mapping_lock:
+                    self.content_links_mapping[content_md5] = raw_links_set
+                    if len(self.content_links_mapping) > self.content_fingerprints_limit:
+                        self.content_links_mapping.popitem(last=False)
+        else:
+            self.duplicate_content_counter += 1
+
+        # relative links are resolved with the referer url of current page
         parsed_urls_set = self.parse_urls(raw_links_set, referer_url)
         return parsed_urls_set
 
@@ -199,7 +387,16 @@ class WebCrawler(object):
 
         return False
 
-    def get_hyper_links(self, url, depth, retry_times=3):
+    def get_hyper_links(self, url, depth, retry_times=3, sampled=False):
+        """ test url and return its hyper links.
+        @params
+            sampled: True if sampling decision has been made for url, i.e. url is being retried,
+                so that url under testing is never skipped by url sampler.
+        """
+        import requests
+        import lxml.etree
+        if self.stop_requested:
+            return set()
         if url in self.whitelist_fullurls:
             return set()
 
@@ -215,6 +412,8 @@ class WebCrawler(object):
             return set()
         if url_host in self.auth_dict and self.auth_dict[url_host]:
             kwargs['auth'] = self.auth_dict[url_host]
+        if self.url_sampler and not sampled and self.url_sampler.should_skip(url):
+            return set()
 
         exception_str = ""
         status_code = '0'
@@ -238,8 +437,10 @@ class WebCrawler(object):
                 resp = requests.get(url, **kwargs)
                 duration_time = time.time() - start_time
                 resp_content_md5 = helpers.get_md5(resp.content)
-                hyper_links_set = self.parse_page_links(resp.url, resp.content)
-                if url not in self.web_urls_mapping:
+                hyper_links_set = self.parse_page_links(resp.url, resp.content, resp_content_md5)
+                if self.url_sampler:
+                    self.url_sampler.add_sample(url, hyper_links_set, resp_content_md5)
+                if self.keep_results and url not in self.web_urls_mapping:
                     self.web_urls_mapping[url] = list(hyper_links_set)
                 status_code = str(resp.status_code)
                 self.url_queue.add_unvisited_urls(hyper_links_set)
@@ -281,22 +482,119 @@ class WebCrawler(object):
             retry_times = 0
 
         self._print_log(depth, url, status_code, duration_time)
-        if retry_times > 0:
+        if retry_times > 0 and not self.budget_exhausted and not self.stop_requested:
             if not status_code.isdigit() or int(status_code) > 400:
                 time.sleep((4-retry_times)*2)
-                return self.get_hyper_links(url, depth, retry_times-1)
-        else:
+                return self.get_hyper_links(url, depth, retry_times-1, sampled=True)
+        elif self.keep_results:
             self.bad_urls_mapping[url] = exception_str
 
-        self.save_categorised_url(status_code, url)
+        if self.url_sampler:
+            # no-op if url has been added as sample
+            self.url_sampler.release(url)
+
         url_test_res = {
             'status_code': status_code,
             'duration_time': duration_time,
             'md5': resp_content_md5
         }
-        self.url_queue.add_visited_url(url, url_test_res)
+        if self.keep_results:
+            self.save_categorised_url(status_code, url)
+            self.url_queue.add_visited_url(url, url_test_res)
+        else:
+            self.url_queue.add_visited_url(url, None)
+        self.emit_result(url, depth, url_test_res, hyper_links_set, exception_str)
         return hyper_links_set
 
+    def add_result_callback(self, callback):
+        """ callback(result) is called in worker threads once an url is tested,
+            result example:
+                {
+                    'url': 'https://store.debugtalk.com/product/osmo',
+                    'depth': 1,
+                    'status_code': '200',
+                    'duration_time': 0.35,
+                    'md5': 'c5e1...',
+                    'error': None,
+                    'links': ['https://store.debugtalk.com/product/mavic-pro']
+                }
+        """
+        self.result_callbacks.append(callback)
+
+    def remove_result_callback(self, callback):
+        if callback in self.result_callbacks:
+            self.result_callbacks.remove(callback)
+
+    def emit_result(self, url, depth, url_test_res, hyper_links_set, exception_str=None):
+        if not self.result_callbacks:
+            return
+
+        result = dict(url_test_res)
+        result.update({
+            'url': url,
+            'depth': depth,
+            'error': exception_str or None,
+            'links': list(hyper_links_set)
+        })
+        for callback in list(self.result_callbacks):
+            try:
+                callback(result)
+            except Exception as ex:
+                color_logging("result callback {} failed: {}".format(callback, str(ex)), 'ERROR')
+
+    def stop(self):
+        """ stop running test, urls not tested yet are skipped.
+        """
+        self.stop_requested = True
+
+    def iter_results(self, cookies={}, crawl_mode='BFS', max_depth=10, concurrency=None,
+                     time_budget=None, max_requests=None, maxsize=1000):
+        """ run test in a background thread, and yield url results as they are tested,
+            see add_result_callback for result format.
+            at most maxsize results are buffered, worker threads wait when the consumer falls behind.
+            the test is stopped if the iteration is closed before it finishes.
+        """
+        results_queue = queue.Queue(maxsize=maxsize)
+        finished = object()
+        errors = []
+        consumer_closed = threading.Event()
+
+        def put_result(result):
+            while not consumer_closed.is_set():
+                try:
+                    results_queue.put(result, timeout=0.5)
+                    return
+                except queue.Full:
+                    continue
+
+        def run():
+            try:
+                self.start(cookies, crawl_mode, max_depth, concurrency, time_budget, max_requests)
+            except Exception as ex:
+                errors.append(ex)
+            finally:
+                put_result(finished)
+
+        self.add_result_callback(put_result)
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
+
+        try:
+            while True:
+                result = results_queue.get()
+                if result is finished:
+                    break
+                yield result
+        finally:
+            consumer_closed.set()
+            self.remove_result_callback(put_result)
+            if thread.is_alive():
+                self.stop()
+
+        if errors:
+            raise errors[0]
+
     def get_referer_urls_set(self, url):
         """ get all referer urls of the specified url.
         """
@@ -379,6 +677,22 @@ class WebCrawler(object):
             else:
                 _print(status_code, urls_list, 'ERROR', True)
 
+    def print_url_clusters(self):
+        """ print coverage of url clusters which have skipped urls in sampling mode.
+        """
+        clusters_report = self.url_sampler.get_clusters_report()
+        output = "url clusters: {}, skipped urls by sampling: {}.\n"\
+            .format(len(clusters_report), self.url_sampler.get_skipped_urls_count())
+        for template, cluster in sorted(clusters_report.items()):
+            if cluster['skipped'] == 0:
+                continue
+            output += "{}, sampled: {}, unique: {}, skipped: {}, coverage: {}%\n".format(
+                template, cluster['sampled'], cluster['unique'], cluster['skipped'],
+                round(cluster['coverage'] * 100, 2))
+
+        color_logging('-' * 120)
+        color_logging(output, 'WARNING')
+
     def run_dfs(self, max_depth):
         """ start to run test in DFS mode.
         """
@@ -396,62 +710,233 @@ class WebCrawler(object):
             for url in urls:
                 crawler(url, depth+1)
 
-        while not self.url_queue.is_unvisited_urls_empty():
-            url = self.url_queue.get_one_unvisited_url()
+        def crawl_unvisited_urls():
+            while not self.url_queue.is_unvisited_urls_empty():
+                url = self.url_queue.get_one_unvisited_url()
+                crawler(url, self.current_depth)
+
+        crawl_unvisited_urls()
+        for url in self.iter_source_seeds():
+            if self.stop_requested:
+                break
             crawler(url, self.current_depth)
+            crawl_unvisited_urls()
 
     def run_bfs(self, max_depth):
         """ start to run test in BFS mode.
         """
-        while self.current_depth <= max_depth:
+        while self.current_depth <= max_depth and not self.stop_requested:
             while not self.url_queue.is_unvisited_urls_empty():
                 url = self.url_queue.get_one_unvisited_url()
+                if self.url_queue.is_url_visited(url):
+                    # e.g. url was tested as a seed of seed sources
+                    continue
                 self.current_depth_unvisited_urls_queue.put_nowait(url)
 
+            if self.current_depth == 0:
+                self.feed_source_seeds()
             self.current_depth_unvisited_urls_queue.join()
             self.current_depth += 1
 
+    def feed_source_seeds(self):
+        """ test urls of seed sources at current depth, in batches of seeds_batch_size,
+            so that seed urls are not all loaded in memory.
+        """
+        from .seed_sources import iter_batches
+        for urls_batch in iter_batches(self.iter_source_seeds(), self.seeds_batch_size):
+            for url in set(urls_batch):
+                if not self.url_queue.is_url_visited(url):
+                    self.current_depth_unvisited_urls_queue.put_nowait(url)
+            self.current_depth_unvisited_urls_queue.join()
+            if self.stop_requested:
+                break
+
+    def run_priority(self, max_depth, concurrency, time_budget=None, max_requests=None):
+        """ start to run test with priority frontier, until all urls are tested
+            or time budget (in seconds) or max requests number runs out.
+        """
+        deadline = time.time() + time_budget if time_budget else None
+        requests_count = 0
+        self.priority_frontier = PriorityUrlQueue(self.get_url_priority_score)
+        while not self.url_queue.is_unvisited_urls_empty():
+            url = self.url_queue.get_one_unvisited_url()
+            self.priority_frontier.put(url, self.current_depth)
+        source_seeds = self.iter_source_seeds() if self.seed_sources else None
+
+        while True:
+            with self.priority_condition:
+                if self.stop_requested:
+                    break
+
+                if (deadline and time.time() >= deadline) \
+                    or (max_requests and requests_count >= max_requests):
+                    # in-flight urls are finished without retry
+                    self.budget_exhausted = True
+                    break
+
+                feed_seeds = source_seeds is not None \
+                    and self.priority_frontier.qsize() < self.seeds_batch_size
+                if not feed_seeds:
+                    if self.priority_frontier.empty():
+                        if self.prioritized_inflight_count == 0:
+                            break
+                        self.priority_condition.wait(0.5)
+                        continue
+
+                    if self.prioritized_inflight_count >= concurrency:
+                        self.priority_condition.wait(0.5)
+                        continue
+
+                    url, depth = self.priority_frontier.get()
+                    if self.url_queue.is_url_visited(url):
+                        continue
+                    self.prioritized_inflight_count += 1
+                    requests_count += 1
+                    self.prioritized_urls_queue.put_nowait((url, depth))
+                    continue
+
+            # feed seeds of seed sources in batches, reading seed sources may be slow,
+            # so it is done without holding the lock, which workers need to finish urls.
+            urls_batch = list(itertools.islice(source_seeds, self.seeds_batch_size))
+            with self.priority_condition:
+                if not urls_batch:
+                    source_seeds = None
+                for url in urls_batch:
+                    if not self.url_queue.is_url_visited(url):
+                        self.priority_frontier.put(url, self.current_depth)
+
+        with self.priority_condition:
+            while self.prioritized_inflight_count > 0:
+                self.priority_condition.wait(0.5)
+            self.untested_urls_count = self.priority_frontier.qsize()
+
+        if source_seeds is not None:
+            # seeds not read yet are untested as well, but remaining seed sources
+            # are not read to count them, which may take much longer than the budget.
+            self.seed_sources_unread = True
+            source_seeds.close()
+
+        # discovered links are saved in priority frontier
+        self.url_queue.clear_unvisited_urls()
+
+    def visit_prioritized_url(self):
+        while True:
+            item = self.prioritized_urls_queue.get()
+            if item is None:
+                # stopped by stop_threads
+                return
+            url, depth = item
+            hyper_links_set = set()
+            try:
+                hyper_links_set = self.get_hyper_links(url, depth)
+            finally:
+                with self.priority_condition:
+                    if depth + 1 <= self.max_depth:
+                        for link in hyper_links_set:
+                            if not self.url_queue.is_url_visited(link):
+                                self.priority_frontier.put(link, depth + 1, url)
+                    self.prioritized_inflight_count -= 1
+                    self.priority_condition.notify_all()
+
     def visit_url(self):
         while True:
             try:
                 url = self.current_depth_unvisited_urls_queue.get()
+                if url is None:
+                    # stopped by stop_threads
+                    return
                 self.get_hyper_links(url, self.current_depth)
             finally:
                 self.current_depth_unvisited_urls_queue.task_done()
 
-    def create_threads(self, concurrency):
+    def create_threads(self, concurrency, target=None):
+        threads = []
         for _ in range(concurrency):
-            thread = threading.Thread(target=self.visit_url)
+            thread = threading.Thread(target=target or self.visit_url)
             thread.daemon = True
             thread.start()
+            threads.append(thread)
+        return threads
 
-    def start(self, cookies={}, crawl_mode='BFS', max_depth=10, concurrency=None):
+    def stop_threads(self, threads, tasks_queue, wait=True):
+        """ stop worker threads by putting one None per thread into tasks_queue,
+            so that threads do not pile up when test is started many times in one process.
+        @params
+            wait: wait for threads to exit, threads finish queued urls before exiting.
+        """
+        for _ in threads:
+            tasks_queue.put_nowait(None)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def start(self, cookies={}, crawl_mode='BFS', max_depth=10, concurrency=None,
+              time_budget=None, max_requests=None):
         """ start to run test in specified crawl_mode.
         @params
-            crawl_mode = 'BFS' or 'DFS'
+            crawl_mode = 'BFS', 'DFS' or 'PRIORITY'
+            time_budget: max running seconds, crawl_mode is PRIORITY if specified
+            max_requests: max tested urls number, crawl_mode is PRIORITY if specified
         """
+        import multiprocessing
         concurrency = int(concurrency or multiprocessing.cpu_count() * 4)
+        if time_budget or max_requests:
+            crawl_mode = 'PRIORITY'
         info = "Start to run test in {} mode, cookies: {}, max_depth: {}, concurrency: {}"\
             .format(crawl_mode, cookies, max_depth, concurrency)
+        if crawl_mode.upper() == 'PRIORITY':
+            info += ", time_budget: {}, max_requests: {}".format(time_budget, max_requests)
         color_logging(info)
         self.reset_all()
-        self.create_threads(concurrency)
+        self.max_depth = max_depth
+        if crawl_mode.upper() == 'PRIORITY':
+            tasks_queue = self.prioritized_urls_queue
+            threads = self.create_threads(concurrency, self.visit_prioritized_url)
+        else:
+            tasks_queue = self.current_depth_unvisited_urls_queue
+            threads = self.create_threads(concurrency)
 
         self.kwargs['cookies'].update(cookies)
         self.cookie_str = '_'.join(['_'.join([key, cookies[key]]) for key in cookies])
 
-        if crawl_mode.upper() == 'BFS':
-            self.run_bfs(max_depth)
-        else:
-            self.run_dfs(max_depth)
+        finished = False
+        try:
+            if crawl_mode.upper() == 'BFS':
+                self.run_bfs(max_depth)
+            elif crawl_mode.upper() == 'PRIORITY':
+                self.run_priority(max_depth, concurrency, time_budget, max_requests)
+            else:
+                self.run_dfs(max_depth)
+            finished = True
+        finally:
+            # workers are idle once test finishes, they are not waited for if test is interrupted
+            self.stop_threads(threads, tasks_queue, wait=finished)
 
         color_logging('=' * 120, color='yellow')
 
+    def get_untested_urls_summary(self):
+        if self.seed_sources_unread:
+            return "at least {} urls in frontier were not tested, seed sources were not fully read"\
+                .format(self.untested_urls_count)
+        return "{} urls in frontier were not tested".format(self.untested_urls_count)
+
     def print_result(self, canceled=False, save_results=False):
         status = "Canceled" if canceled else "Finished"
         color_logging("{}. The crawler has tested {} urls."\
             .format(status, self.url_queue.get_visited_urls_count()))
+        if self.untested_urls_count or self.seed_sources_unread:
+            color_logging("Crawl budget ran out, {}."\
+                .format(self.get_untested_urls_summary()), 'WARNING')
+        if self.dns_cache:
+            color_logging("DNS cache hits: {}, misses: {}, hit rate: {}%, prefetched hosts: {}."\
+                .format(self.dns_cache.hits_count, self.dns_cache.misses_count,
+                        round(self.dns_cache.get_hit_rate() * 100, 2), self.dns_cache.prefetched_count))
+        if self.duplicate_content_counter:
+            color_logging("{} pages reused parsed hyper links of duplicate content."\
+                .format(self.duplicate_content_counter))
         self.print_categorised_urls()
+        if self.url_sampler:
+            self.print_url_clusters()
 
         if save_results:
             urls_mapping_log_path = os.path.join(self.logs_folder, 'urls_mapping.yml')
@@ -460,6 +945,10 @@ class WebCrawler(object):
             visited_urls_log_path = os.path.join(self.logs_folder, 'visited_urls.yml')
             helpers.save_to_yaml(self.url_queue.get_visited_urls(), visited_urls_log_path)
             color_logging("Save visited urls in YAML file: {}".format(visited_urls_log_path))
+            if self.url_sampler:
+                url_clusters_log_path = os.path.join(self.logs_folder, 'url_clusters.yml')
+                helpers.save_to_yaml(self.url_sampler.get_clusters_report(), url_clusters_log_path)
+                color_logging("Save url clusters in YAML file: {}".format(url_clusters_log_path))
 
     def get_mail_content_ordered_dict(self):
         website_urls = [website['url'] for website in self.website_list]
@@ -468,6 +957,11 @@ class WebCrawler(object):
             "Total tested urls number": self.url_queue.get_visited_urls_count(),
             "===== Detailed": "Statistics ====="
         })
+        if self.untested_urls_count or self.seed_sources_unread:
+            mail_content_ordered_dict["Untested urls by crawl budget"] = self.get_untested_urls_summary()
+        if self.url_sampler:
+            mail_content_ordered_dict["Skipped urls by sampling"] = \
+                self.url_sampler.get_skipped_urls_count()
 
         flag_code = 0
 
@@ -0,0 +1,447 @@
+#encoding=utf-8
+""" distributed crawl, one coordinator owns the frontier and several workers fetch urls.
+
+protocol: newline-delimited JSON messages over a TCP or unix stream socket.
+    worker => coordinator:
+        {"type": "hello"}
+        {"type": "fetch", "max": 20}
+        {"type": "result", "url": url, "depth": 1, "result": {...}, "links": [...], "error": "..."}
+        {"type": "bye"}
+    coordinator => worker:
+        {"type": "welcome", "worker_id": 1, "seeds": "...", "include_hosts": [...], "grey_env": [...]}
+        {"type": "batch", "cookies": {...}, "urls": [[url, depth], ...]}
+        {"type": "wait"}
+        {"type": "done"}
+"""
+import os
+import json
+import time
+import zlib
+import queue
+import socket
+import threading
+import socketserver
+from collections import deque
+
+from .core import WebCrawler
+from .helpers import color_logging
+from .url_queue import UrlQueue
+from . import helpers
+
+
+def parse_address(address):
+    """ parse coordinator address.
+    @params
+        address example:
+            - tcp://127.0.0.1:8765
+            - 127.0.0.1:8765
+            - unix:///tmp/webcrawler.sock
+    @return
+        (socket family, socket address)
+    """
+    if address.startswith('unix://'):
+        return socket.AF_UNIX, address[len('unix://'):]
+
+    if address.startswith('tcp://'):
+        address = address[len('tcp://'):]
+    host, port = address.rsplit(':', 1)
+    return socket.AF_INET, (host or '0.0.0.0', int(port))
+
+
+def get_partition(url, partitions_number):
+    """ partition url by a stable hash of its netloc, so that one host is always crawled by one worker.
+    """
+    netloc = helpers.get_parsed_object_from_url(url).netloc
+    return (zlib.crc32(netloc.encode('utf-8')) & 0xffffffff) % partitions_number
+
+
+def send_message(wfile, message):
+    wfile.write(json.dumps(message).encode('utf-8') + b'\n')
+    wfile.flush()
+
+
+def recv_message(rfile):
+    line = rfile.readline()
+    if not line:
+        return None
+    return json.loads(line.decode('utf-8'))
+
+
+class CoordinatorRequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        coordinator = self.server.coordinator
+        worker_id = coordinator.register_worker()
+        try:
+            while True:
+                message = recv_message(self.rfile)
+                if message is None or message['type'] == 'bye':
+                    break
+                elif message['type'] == 'hello':
+                    send_message(self.wfile, coordinator.get_welcome_message(worker_id))
+                elif message['type'] == 'fetch':
+                    send_message(self.wfile, coordinator.get_batch_message(worker_id, message['max']))
+                elif message['type'] == 'result':
+                    coordinator.save_result(worker_id, message)
+        except (socket.error, ValueError) as ex:
+            color_logging("worker {} disconnected: {}".format(worker_id, str(ex)), 'WARNING')
+        finally:
+            coordinator.unregister_worker(worker_id)
+
+
+class ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class ThreadingUnixStreamServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class CrawlCoordinator(object):
+    """ own the crawl frontier, hand out url batches to workers and collect their results.
+        frontier is split into partitions by netloc hash, a partition is owned by the worker
+        which claims it first, until that worker disconnects.
+        results are saved into web_crawler, so print_result and mail content work as usual.
+    """
+
+    def __init__(self, web_crawler, address, partitions_number=64, batch_size=20):
+        self.web_crawler = web_crawler
+        self.address = address
+        self.partitions_number = partitions_number
+        self.batch_size = batch_size
+
+        self.condition = threading.Condition()
+        self.frontier = [deque() for _ in range(partitions_number)]
+        self.partition_owners = {}
+        self.inflight_urls = {}
+        self.seen_urls = set()
+        self.pending_urls_count = 0
+        self.max_depth = 0
+        self.running = False
+        self.closed = False
+        self.worker_counter = 0
+        self.server = None
+
+    def serve(self):
+        family, server_address = parse_address(self.address)
+        if family == socket.AF_UNIX:
+            if os.path.exists(server_address):
+                os.remove(server_address)
+            self.server = ThreadingUnixStreamServer(server_address, CoordinatorRequestHandler)
+        else:
+            self.server = ThreadingTCPServer(server_address, CoordinatorRequestHandler)
+        self.server.coordinator = self
+
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        color_logging("Coordinator is listening on {}".format(self.server.server_address))
+
+    def stop(self, timeout=10):
+        """ tell workers to quit, and wait for them to disconnect.
+        """
+        with self.condition:
+            self.closed = True
+            end_time = time.time() + timeout
+            while self.inflight_urls and time.time() < end_time:
+                self.condition.wait(0.5)
+
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            if isinstance(self.server.server_address, str) and os.path.exists(self.server.server_address):
+                os.remove(self.server.server_address)
+
+    def start(self, cookies={}, max_depth=10):
+        """ crawl website seeds with workers, block until the frontier is exhausted.
+        """
+        info = "Start to run test in distributed mode, cookies: {}, max_depth: {}, batch_size: {}"\
+            .format(cookies, max_depth, self.batch_size)
+        color_logging(info)
+
+        web_crawler = self.web_crawler
+        web_crawler.kwargs['cookies'].update(cookies)
+        web_crawler.cookie_str = '_'.join(['_'.join([key, cookies[key]]) for key in cookies])
+
+        with self.condition:
+            self.max_depth = max_depth
+            self.seen_urls = set()
+            for website in web_crawler.website_list:
+                website_url = website['url']
+                web_crawler.url_queue.remove_visited_url(website_url)
+                self._add_url(website_url, 0)
+
+            self.running = self.pending_urls_count > 0
+            while self.running:
+                self.condition.wait(1)
+
+        color_logging('=' * 120, color='yellow')
+
+    def _add_url(self, url, depth):
+        if url == "" \
+            or url is None \
+            or url in self.seen_urls \
+            or self.web_crawler.url_queue.is_url_visited(url):
+            return
+        self.seen_urls.add(url)
+        self.frontier[get_partition(url, self.partitions_number)].append((url, depth))
+        self.pending_urls_count += 1
+
+    def _check_finished(self):
+        if self.pending_urls_count == 0 \
+            and not any(self.inflight_urls.values()):
+            self.running = False
+            self.condition.notify_all()
+
+    def register_worker(self):
+        with self.condition:
+            self.worker_counter += 1
+            worker_id = self.worker_counter
+            self.inflight_urls[worker_id] = {}
+        color_logging("worker {} connected.".format(worker_id))
+        return worker_id
+
+    def unregister_worker(self, worker_id):
+        """ put back urls not finished by worker, and release its partitions.
+        """
+        with self.condition:
+            for url, depth in self.inflight_urls.pop(worker_id, {}).items():
+                self.frontier[get_partition(url, self.partitions_number)].appendleft((url, depth))
+                self.pending_urls_count += 1
+
+            for partition, owner in list(self.partition_owners.items()):
+                if owner == worker_id:
+                    del self.partition_owners[partition]
+
+            self.condition.notify_all()
+        color_logging("worker {} disconnected.".format(worker_id))
+
+    def get_welcome_message(self, worker_id):
+        web_crawler = self.web_crawler
+        if web_crawler.grey_env:
+            grey_env = [
+                web_crawler.grey_user_agent,
+                web_crawler.kwargs['cookies'].get('traceid'),
+                web_crawler.kwargs['cookies'].get('view_grey')
+            ]
+        else:
+            grey_env = None
+
+        return {
+            'type': 'welcome',
+            'worker_id': worker_id,
+            'seeds': '|'.join([
+                '{}:{}@{}'.format(website['auth'][0], website['auth'][1], website['url'])
+                if website['auth'] else website['url']
+                for website in web_crawler.website_list
+            ]),
+            'include_hosts': list(web_crawler.include_hosts_set),
+            'grey_env': grey_env
+        }
+
+    def get_batch_message(self, worker_id, max_urls_count):
+        with self.condition:
+            if self.closed:
+                return {'type': 'done'}
+            if not self.running:
+                return {'type': 'wait'}
+
+            max_urls_count = min(max_urls_count, self.batch_size)
+            owned_partitions = [
+                partition for partition, owner in self.partition_owners.items()
+                if owner == worker_id
+            ]
+            batch = self._pop_urls(owned_partitions, max_urls_count)
+
+            if not batch:
+                # claim one more partition which has urls and no owner
+                for partition in range(self.partitions_number):
+                    if partition not in self.partition_owners and self.frontier[partition]:
+                        self.partition_owners[partition] = worker_id
+                        batch = self._pop_urls([partition], max_urls_count)
+                        break
+
+            if not batch:
+                return {'type': 'wait'}
+
+            inflight_urls = self.inflight_urls[worker_id]
+            for url, depth in batch:
+                inflight_urls[url] = depth
+            self.pending_urls_count -= len(batch)
+
+            return {
+                'type': 'batch',
+                'cookies': self.web_crawler.kwargs['cookies'],
+                'urls': batch
+            }
+
+    def _pop_urls(self, partitions, max_urls_count):
+        batch = []
+        for partition in partitions:
+            urls_deque = self.frontier[partition]
+            while urls_deque and len(batch) < max_urls_count:
+                batch.append(urls_deque.popleft())
+        return batch
+
+    def save_result(self, worker_id, message):
+        url = message['url']
+        depth = message['depth']
+        url_test_res = message.get('result')
+        error = message.get('error')
+        web_crawler = self.web_crawler
+        if 'worker_error' in message:
+            # url test raised on worker, report it instead of dropping the url
+            url_test_res = {'status_code': 'WorkerError', 'duration_time': 0, 'md5': None}
+            error = message['worker_error']
+
+        with self.condition:
+            self.inflight_urls.get(worker_id, {}).pop(url, None)
+
+            if url_test_res:
+                status_code = url_test_res['status_code']
+                web_crawler._print_log(depth, url, status_code, url_test_res['duration_time'])
+                if web_crawler.keep_results:
+                    web_crawler.save_categorised_url(status_code, url)
+                    web_crawler.url_queue.add_visited_url(url, url_test_res)
+                    if error is not None:
+                        web_crawler.bad_urls_mapping[url] = error
+                else:
+                    web_crawler.url_queue.add_visited_url(url, None)
+
+            links = message.get('links')
+            if links is not None:
+                if web_crawler.keep_results and url not in web_crawler.web_urls_mapping:
+                    web_crawler.web_urls_mapping[url] = links
+                if depth + 1 <= self.max_depth:
+                    for link in links:
+                        self._add_url(link, depth + 1)
+
+            self._check_finished()
+
+        # result callbacks may block, call them without holding the lock
+        if url_test_res:
+            web_crawler.emit_result(url, depth, url_test_res, links or [], error)
+
+
+class WorkerUrlQueue(UrlQueue):
+    """ discovered links are sent to coordinator, which owns the frontier,
+        so worker does not keep unvisited urls, and only prefetches DNS of their new hosts.
+    """
+
+    def add_unvisited_url(self, url):
+        if url == "" or url is None:
+            return
+        self.check_new_host(url)
+
+
+class CrawlWorker(object):
+    """ connect to coordinator, crawl url batches with WebCrawler.get_hyper_links and stream back results.
+    """
+
+    def __init__(self, address, logs_folder, config_file=None, concurrency=None,
+                 batch_size=None, poll_interval=0.2):
+        import multiprocessing
+        self.address = address
+        self.logs_folder = logs_folder
+        self.config_file = config_file
+        self.concurrency = int(concurrency or multiprocessing.cpu_count() * 4)
+        self.batch_size = int(batch_size or self.concurrency)
+        self.poll_interval = poll_interval
+        self.send_lock = threading.Lock()
+        self.task_queue = queue.Queue(maxsize=self.concurrency)
+        self.web_crawler = None
+        self.cookies = None
+
+    def send(self, message):
+        with self.send_lock:
+            send_message(self.wfile, message)
+
+    def connect(self):
+        family, server_address = parse_address(self.address)
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.connect(server_address)
+        self.rfile = self.sock.makefile('rb')
+        self.wfile = self.sock.makefile('wb')
+
+        self.send({'type': 'hello'})
+        welcome = recv_message(self.rfile)
+        self.worker_id = welcome['worker_id']
+        self.web_crawler = WebCrawler(
+            welcome['seeds'], welcome['include_hosts'], self.logs_folder, self.config_file)
+        self.web_crawler.url_queue = WorkerUrlQueue()
+        if self.web_crawler.dns_cache_ttl:
+            self.web_crawler.enable_dns_cache(self.web_crawler.dns_cache_ttl)
+        if welcome['grey_env']:
+            self.web_crawler.set_grey_env(*welcome['grey_env'])
+        color_logging("Worker {} connected to coordinator {}".format(self.worker_id, self.address))
+
+    def set_cookies(self, cookies):
+        if cookies == self.cookies:
+            return
+        self.cookies = cookies
+        self.web_crawler.kwargs['cookies'].update(cookies)
+        self.web_crawler.cookie_str = '_'.join(['_'.join([key, cookies[key]]) for key in cookies])
+
+    def pop_result(self, url, depth):
+        """ pop url result out of web_crawler, the coordinator keeps all results.
+        """
+        web_crawler = self.web_crawler
+        message = {
+            'type': 'result',
+            'url': url,
+            'depth': depth,
+            'result': web_crawler.url_queue.get_visited_urls().pop(url, None),
+            'links': web_crawler.web_urls_mapping.pop(url, None)
+        }
+        if url in web_crawler.bad_urls_mapping:
+            message['error'] = web_crawler.bad_urls_mapping.pop(url)
+        for urls_set in list(web_crawler.categorised_urls.values()):
+            urls_set.discard(url)
+        return message
+
+    def visit_url(self):
+        while True:
+            url, depth = self.task_queue.get()
+            try:
+                self.web_crawler.get_hyper_links(url, depth)
+                message = self.pop_result(url, depth)
+            except Exception as ex:
+                color_logging("{}: {}".format(url, str(ex)), 'ERROR')
+                message = {
+                    'type': 'result',
+                    'url': url,
+                    'depth': depth,
+                    'worker_error': "{}: {}".format(type(ex).__name__, str(ex))
+                }
+            try:
+                self.send(message)
+            finally:
+                self.task_queue.task_done()
+
+    def run(self):
+        self.connect()
+        for _ in range(self.concurrency):
+            thread = threading.Thread(target=self.visit_url)
+            thread.daemon = True
+            thread.start()
+
+        try:
+            while True:
+                self.send({'type': 'fetch', 'max': self.batch_size})
+                message = recv_message(self.rfile)
+                if message is None or message['type'] == 'done':
+                    break
+                elif message['type'] == 'wait':
+                    time.sleep(self.poll_interval)
+                    continue
+
+                self.set_cookies(message['cookies'])
+                for url, depth in message['urls']:
+                    self.task_queue.put((url, depth))
+
+            self.task_queue.join()
+            self.send({'type': 'bye'})
+        finally:
+            self.sock.close()
+        color_logging("Worker {} finished.".format(self.worker_id))
@@ -0,0 +1,125 @@
+#encoding=utf-8
+import time
+import queue
+import socket
+import threading
+
+_original_getaddrinfo = socket.getaddrinfo
+_installed_dns_cache = None
+
+
+class DnsCache(object):
+    """ cache socket.getaddrinfo results of TCP connections with TTL, shared by all worker threads.
+        hosts can be prefetched in background threads, so that DNS lookup is not on the request path.
+    """
+
+    def __init__(self, ttl=300, prefetch_concurrency=4):
+        self.ttl = ttl
+        self.prefetch_concurrency = prefetch_concurrency
+        self.hits_count = 0
+        self.misses_count = 0
+        self.prefetched_count = 0
+        self._cache_dict = {}
+        self._prefetching_set = set()
+        self._lock = threading.Lock()
+        self._prefetch_queue = queue.Queue()
+
+        for _ in range(prefetch_concurrency):
+            thread = threading.Thread(target=self._prefetch_worker)
+            thread.daemon = True
+            thread.start()
+
+    def _lookup(self, host, port):
+        addrinfo_list = _original_getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        with self._lock:
+            self._cache_dict[(host, str(port))] = (time.time() + self.ttl, addrinfo_list)
+        return addrinfo_list
+
+    def _get_cached(self, host, port):
+        entry = self._cache_dict.get((host, str(port)))
+        if entry and entry[0] > time.time():
+            return entry[1]
+        return None
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        """ same as socket.getaddrinfo, only TCP lookups are cached.
+        """
+        if type != socket.SOCK_STREAM or proto or flags:
+            return _original_getaddrinfo(host, port, family, type, proto, flags)
+
+        addrinfo_list = self._get_cached(host, port)
+        with self._lock:
+            if addrinfo_list is None:
+                self.misses_count += 1
+            else:
+                self.hits_count += 1
+        if addrinfo_list is None:
+            addrinfo_list = self._lookup(host, port)
+
+        if family:
+            addrinfo_list = [addrinfo for addrinfo in addrinfo_list if addrinfo[0] == family]
+            if not addrinfo_list:
+                return _original_getaddrinfo(host, port, family, type, proto, flags)
+        return list(addrinfo_list)
+
+    def prefetch(self, host, port):
+        """ resolve host in background if it is not cached.
+        """
+        if not host or self._get_cached(host, port) is not None:
+            return
+        with self._lock:
+            if (host, port) in self._prefetching_set:
+                return
+            self._prefetching_set.add((host, port))
+        self._prefetch_queue.put((host, port))
+
+    def _prefetch_worker(self):
+        while True:
+            item = self._prefetch_queue.get()
+            if item is None:
+                # closed
+                return
+            host, port = item
+            try:
+                self._lookup(host, port)
+                with self._lock:
+                    self.prefetched_count += 1
+            except (socket.error, UnicodeError):
+                # resolved again when the host is requested
+                pass
+            finally:
+                with self._lock:
+                    self._prefetching_set.discard((host, port))
+
+    def close(self):
+        """ stop prefetch threads, cached lookups and stats are kept.
+        """
+        for _ in range(self.prefetch_concurrency):
+            self._prefetch_queue.put(None)
+
+    def get_hit_rate(self):
+        lookups_count = self.hits_count + self.misses_count
+        if lookups_count == 0:
+            return 0.0
+        return float(self.hits_count) / lookups_count
+
+
+def install_dns_cache(ttl=300):
+    """ replace socket.getaddrinfo with a process-level DnsCache, return the installed DnsCache.
+    """
+    global _installed_dns_cache
+    if _installed_dns_cache is None:
+        _installed_dns_cache = DnsCache(ttl)
+        socket.getaddrinfo = _installed_dns_cache.getaddrinfo
+    _installed_dns_cache.ttl = ttl
+    return _installed_dns_cache
+
+
+def uninstall_dns_cache():
+    """ restore socket.getaddrinfo, and stop prefetch threads of the installed DnsCache.
+    """
+    global _installed_dns_cache
+    socket.getaddrinfo = _original_getaddrinfo
+    if _installed_dns_cache is not None:
+        _installed_dns_cache.close()
+    _installed_dns_cache = None
@@ -1,5 +1,5 @@
 import os
-import yaml
+import re
 import json
 import hashlib
 import logging
@@ -15,6 +15,7 @@ except ImportError:
     from urllib import urlencode
 
 urlparsed_object_mapping = {}
+compiled_config_mapping = {}
 
 def get_parsed_object_from_url(url):
     if url in urlparsed_object_mapping:
@@ -90,6 +91,81 @@ def make_url_with_referer(url, referer_url):
         )
         return origin_parsed_obj.geturl()
 
+def get_query_params_regex(ignore_params):
+    """ compile query params patterns into one regex, '*' matches any characters.
+        e.g. ['utm_*', 'gclid'] => ^(?:utm_.*|gclid)$
+    """
+    if not ignore_params:
+        return None
+    patterns = [re.escape(param).replace(r'\*', '.*') for param in ignore_params]
+    return re.compile('^(?:{})$'.format('|'.join(patterns)))
+
+def canonicalize_url_query(url, ignore_params_regex=None, sort_params=False):
+    """ remove ignored params from url query, and sort the remaining params if sort_params.
+        params are kept as they are in url, without decoding or encoding.
+    @params
+        url: e.g. https://store.debugtalk.com/product/osmo?utm_source=home&color=white
+        ignore_params_regex: compiled by get_query_params_regex(['utm_*'])
+    @return
+        e.g. https://store.debugtalk.com/product/osmo?color=white
+    """
+    parsed_object = urlparse.urlparse(url)
+    if not parsed_object.query:
+        return url
+
+    params = [param for param in parsed_object.query.split('&') if param]
+    if ignore_params_regex:
+        params = [
+            param for param in params
+            if not ignore_params_regex.match(urlparse.unquote(param.split('=', 1)[0]))
+        ]
+    if sort_params:
+        params.sort()
+
+    return parsed_object._replace(query='&'.join(params)).geturl()
+
+url_segment_patterns = [
+    ('<num>', re.compile(r'^\d+$')),
+    ('<id>', re.compile(r'^(?=.*\d)[0-9a-fA-F]{8,}$|^[0-9a-fA-F]{8}(-[0-9a-fA-F]{4}){3}-[0-9a-fA-F]{12}$')),
+    ('<slug>', re.compile(r'^(?=.*[a-zA-Z])[\w]+([\-_.][\w]+)+$|^(?=.*[a-zA-Z])(?=.*\d)\w{4,}$')),
+]
+
+def get_url_segment_template(segment):
+    """ collapse numeric, id and slug segments, keep file extension.
+        e.g. 123 => <num>, phantom-4-pro => <slug>, 123.html => <num>.html
+    """
+    name, dot, extension = segment.rpartition('.')
+    if not dot or not extension.isalpha():
+        name, extension = segment, ''
+
+    for placeholder, pattern in url_segment_patterns:
+        if pattern.match(name):
+            return placeholder + ('.' + extension if extension else '')
+
+    return segment
+
+def get_url_template(url):
+    """ get url path pattern, which is used to cluster urls sharing one page template.
+    @params
+        url: e.g. https://store.debugtalk.com/product/phantom-4-pro?color=white&from=home
+    @return
+        e.g. store.debugtalk.com/product/<slug>?color&from
+    """
+    parsed_object = get_parsed_object_from_url(url)
+    path = '/'.join([
+        get_url_segment_template(segment)
+        for segment in parsed_object.path.split('/')
+    ])
+    template = parsed_object.netloc + path
+
+    if parsed_object.query:
+        query_keys = sorted(set(
+            key for key, _ in urlparse.parse_qsl(parsed_object.query, keep_blank_values=True)
+        ))
+        template += '?' + '&'.join(query_keys)
+
+    return template
+
 def color_logging(text, log_level='info', color=None):
     log_level = log_level.upper()
     if log_level == 'DEBUG':
@@ -110,8 +186,68 @@ def load_json_file(json_file):
         return f.read()
 
 def load_yaml_file(yaml_file):
+    import yaml
+    # prefer the libyaml based C loader, it is much faster than the pure-Python one
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
     with open(yaml_file, 'r') as stream:
-        return yaml.load(stream)
+        return yaml.load(stream, Loader=loader)
+
+def get_config_cache_folder():
+    return os.environ.get(
+        'WEBCRAWLER_CACHE_DIR',
+        os.path.join(os.path.expanduser('~'), '.cache', 'webcrawler')
+    )
+
+def load_compiled_config(config_file, compile_func):
+    """ load YAML config file and compile it with compile_func.
+        compiled result is cached in memory and in the cache folder in JSON format,
+        keyed by config file path, mtime, size and compile_func code, so YAML is only parsed when file changes.
+    @params
+        config_file: absolute path of YAML config file.
+        compile_func: function which converts the parsed config dict into a JSON serializable dict.
+    """
+    import marshal
+    from . import __version__
+    file_stat = os.stat(config_file)
+    # compile_func code is part of the key, so that cache is refreshed when it changes
+    compile_func_md5 = get_md5(marshal.dumps(compile_func.__code__))
+    cache_key = [__version__, compile_func_md5, config_file, file_stat.st_mtime, file_stat.st_size]
+    cache_key_str = json.dumps(cache_key)
+
+    if cache_key_str in compiled_config_mapping:
+        return compiled_config_mapping[cache_key_str]
+
+    cache_file = os.path.join(
+        get_config_cache_folder(),
+        'config-{}.json'.format(get_md5(config_file.encode('utf-8')))
+    )
+    try:
+        with open(cache_file, 'r') as f:
+            cached = json.load(f)
+        if cached.get('key') == cache_key:
+            compiled_config_mapping[cache_key_str] = cached['config']
+            return cached['config']
+    except (IOError, OSError, ValueError, AttributeError):
+        pass
+
+    compiled_config = compile_func(load_yaml_file(config_file))
+    compiled_config_mapping[cache_key_str] = compiled_config
+
+    try:
+        try:
+            os.makedirs(os.path.dirname(cache_file))
+        except OSError:
+            pass
+        content = json.dumps({'key': cache_key, 'config': compiled_config})
+        tmp_cache_file = '{}.{}.tmp'.format(cache_file, os.getpid())
+        with open(tmp_cache_file, 'w') as f:
+            f.write(content)
+        os.rename(tmp_cache_file, cache_file)
+    except (IOError, OSError, TypeError, ValueError):
+        # cache folder is not writable or config is not JSON serializable, just skip caching
+        pass
+
+    return compiled_config
 
 def get_md5(content):
     return hashlib.md5(content).hexdigest()
@@ -132,6 +268,7 @@ def load_file(file_path, file_suffix='.json'):
         }
 
 def save_to_yaml(data, filepath):
+    import yaml
     file_dir = os.path.dirname(filepath)
     try:
         os.makedirs(file_dir)
@@ -0,0 +1,135 @@
+#encoding=utf-8
+""" stream seed urls from sitemaps and url list files, without loading them in memory.
+"""
+import io
+import os
+import gzip
+import itertools
+from contextlib import contextmanager
+
+# errors of reading a seed source: requests and gzip errors are IOError,
+# truncated gzip raises EOFError, and lxml XMLSyntaxError is SyntaxError
+SOURCE_ERRORS = (IOError, OSError, EOFError, SyntaxError, ValueError)
+
+
+class ChunksStream(io.RawIOBase):
+    """ readable binary stream over an iterator of bytes chunks, e.g. requests iter_content.
+    """
+
+    def __init__(self, chunks_iterator):
+        self._chunks_iterator = chunks_iterator
+        self._pending = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending:
+            try:
+                self._pending = next(self._chunks_iterator)
+            except StopIteration:
+                return 0
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def is_url(source):
+    return source.startswith('http://') or source.startswith('https://')
+
+
+@contextmanager
+def open_source(source, requests_kwargs=None):
+    """ open local file path or url as binary stream, gzip content is decompressed transparently.
+    """
+    resp = None
+    if is_url(source):
+        import requests
+        resp = requests.get(source, stream=True, **(requests_kwargs or {}))
+        resp.raise_for_status()
+        stream = io.BufferedReader(ChunksStream(resp.iter_content(64 * 1024)))
+    else:
+        stream = open(source, 'rb')
+
+    try:
+        if stream.peek(2)[:2] == b'\x1f\x8b':
+            with gzip.GzipFile(fileobj=stream) as gzip_stream:
+                yield gzip_stream
+        else:
+            yield stream
+    finally:
+        stream.close()
+        if resp is not None:
+            resp.close()
+
+
+def iter_sitemap_urls(source, requests_kwargs=None, error_callback=None):
+    """ parse sitemap or sitemap index incrementally, and yield page urls.
+        sitemaps listed in sitemap index are parsed after it.
+    @params
+        source: sitemap file path or url, e.g. https://debugtalk.com/sitemap.xml.gz
+        error_callback: error_callback(sitemap, ex) is called when reading a sitemap fails,
+            and the remaining sitemaps are still parsed. errors are raised if it is not set.
+    """
+    import lxml.etree
+    sitemaps = [source]
+    parsed_sitemaps_set = set()
+
+    while sitemaps:
+        sitemap = sitemaps.pop(0)
+        if sitemap in parsed_sitemaps_set:
+            continue
+        parsed_sitemaps_set.add(sitemap)
+
+        nested_sitemaps = []
+        try:
+            with open_source(sitemap, requests_kwargs) as stream:
+                events = lxml.etree.iterparse(
+                    stream, events=('end',), resolve_entities=False, no_network=True, huge_tree=True)
+                for _, element in events:
+                    tag = element.tag.rpartition('}')[2]
+                    if tag == 'loc':
+                        loc = (element.text or '').strip()
+                        parent_tag = element.getparent().tag.rpartition('}')[2]
+                        if not loc:
+                            continue
+                        if parent_tag == 'sitemap':
+                            if not is_url(loc) and not is_url(sitemap) and not os.path.isabs(loc):
+                                # relative path in local sitemap index
+                                loc = os.path.join(os.path.dirname(sitemap), loc)
+                            nested_sitemaps.append(loc)
+                        else:
+                            yield loc
+                    elif tag in ('url', 'sitemap'):
+                        # free parsed elements, so that memory does not grow with sitemap size
+                        element.clear()
+                        while element.getprevious() is not None:
+                            del element.getparent()[0]
+        except SOURCE_ERRORS as ex:
+            if error_callback is None:
+                raise
+            error_callback(sitemap, ex)
+
+        # sitemaps found before a broken part of an index are still parsed
+        sitemaps.extend(nested_sitemaps)
+
+
+def iter_url_list(source, requests_kwargs=None):
+    """ yield urls of newline-delimited urls file, blank lines and lines starting with # are ignored.
+    """
+    with open_source(source, requests_kwargs) as stream:
+        for line in stream:
+            url = line.decode('utf-8').strip()
+            if not url or url.startswith('#'):
+                continue
+            yield url
+
+
+def iter_batches(iterable, batch_size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
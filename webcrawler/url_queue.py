@@ -1,5 +1,9 @@
 #encoding=utf-8
+import heapq
 import queue
+import itertools
+
+from . import helpers
 
 class UniqueQueue(queue.Queue):
 
@@ -22,6 +26,9 @@ class UrlQueue(object):
     def __init__(self):
         self._visited_urls_dict = {}
         self._unvisited_urls_queue = UniqueQueue()
+        self._hosts_set = set()
+        # called with parsed url object when an url with new host is added
+        self.new_host_callback = None
 
     def add_visited_url(self, url, url_test_res):
         if url == "" \
@@ -43,8 +50,16 @@ class UrlQueue(object):
             or url is None \
             or url in self._visited_urls_dict:
             return
+        self.check_new_host(url)
         self._unvisited_urls_queue.put_nowait(url)
 
+    def check_new_host(self, url):
+        if self.new_host_callback:
+            parsed_object = helpers.get_parsed_object_from_url(url)
+            if parsed_object.netloc not in self._hosts_set:
+                self._hosts_set.add(parsed_object.netloc)
+                self.new_host_callback(parsed_object)
+
     def add_unvisited_urls(self, urls):
         if isinstance(urls, str):
             self.add_unvisited_url(urls)
@@ -69,3 +84,57 @@ class UrlQueue(object):
 
     def is_unvisited_urls_empty(self):
         return self._unvisited_urls_queue.empty()
+
+
+class PriorityUrlQueue(object):
+    """ unvisited urls frontier ordered by score, url with higher score is popped first.
+        score of an url is computed by score_func(url, depth, referers_count), and updated
+        when the url is put again from another referer. it is not thread safe.
+    """
+    def __init__(self, score_func):
+        self.score_func = score_func
+        self._heap = []
+        self._entries_dict = {}
+        self._popped_urls_set = set()
+        self._counter = itertools.count()
+
+    def put(self, url, depth, referer_url=None):
+        if url == "" \
+            or url is None \
+            or url in self._popped_urls_set:
+            return
+
+        entry = self._entries_dict.get(url)
+        if entry is None:
+            entry = self._entries_dict[url] = {
+                'depth': depth,
+                'referers': set()
+            }
+        else:
+            entry['depth'] = min(entry['depth'], depth)
+        if referer_url:
+            entry['referers'].add(referer_url)
+
+        entry['score'] = self.score_func(url, entry['depth'], len(entry['referers']))
+        # outdated heap items of url are skipped in get, ties are popped in FIFO order
+        heapq.heappush(self._heap, (-entry['score'], next(self._counter), url))
+
+    def get(self):
+        """ pop url with highest score, return (url, depth).
+        """
+        while self._heap:
+            negative_score, _, url = heapq.heappop(self._heap)
+            entry = self._entries_dict.get(url)
+            if entry is None or entry['score'] != -negative_score:
+                continue
+            del self._entries_dict[url]
+            self._popped_urls_set.add(url)
+            return url, entry['depth']
+
+        raise queue.Empty
+
+    def qsize(self):
+        return len(self._entries_dict)
+
+    def empty(self):
+        return not self._entries_dict
@@ -0,0 +1,97 @@
+#encoding=utf-8
+import threading
+
+from . import helpers
+
+
+class UrlSampler(object):
+    """ cluster urls by path template, and only crawl a few representatives of each cluster.
+        a representative page is unique if it links to url templates not linked by
+        earlier representatives of its cluster, unique pages do not consume the samples budget.
+        once a cluster has sample_per_cluster non-unique representatives, remaining urls are skipped.
+        representatives being tested count as non-unique ones, so that concurrent workers
+        do not test a whole cluster before its first samples are added.
+    """
+
+    def __init__(self, sample_per_cluster, sample_by_md5=False):
+        self.sample_per_cluster = sample_per_cluster
+        self.sample_by_md5 = sample_by_md5
+        self._clusters_dict = {}
+        self._lock = threading.Lock()
+
+    def _get_cluster(self, url):
+        template = helpers.get_url_template(url)
+        if template not in self._clusters_dict:
+            self._clusters_dict[template] = {
+                'sampled_urls': set(),
+                'testing_urls': set(),
+                'skipped_urls': set(),
+                'unique_count': 0,
+                'links_templates': set(),
+                'md5s': set()
+            }
+        return self._clusters_dict[template]
+
+    def _is_saturated(self, cluster):
+        non_unique_count = len(cluster['sampled_urls']) - cluster['unique_count'] \
+            + len(cluster['testing_urls'])
+        return non_unique_count >= self.sample_per_cluster
+
+    def should_skip(self, url):
+        """ check if url can be skipped, as its cluster already has enough representatives.
+            if not, url takes a representative slot of its cluster until add_sample or release is called.
+        """
+        with self._lock:
+            cluster = self._get_cluster(url)
+            if url in cluster['sampled_urls'] or url in cluster['testing_urls']:
+                return False
+            if not self._is_saturated(cluster):
+                cluster['testing_urls'].add(url)
+                return False
+            cluster['skipped_urls'].add(url)
+            return True
+
+    def release(self, url):
+        """ free representative slot of url if it is not added as sample, e.g. url failed or is not a page.
+        """
+        with self._lock:
+            self._get_cluster(url)['testing_urls'].discard(url)
+
+    def add_sample(self, url, hyper_links_set, md5=None):
+        """ save a crawled page of the cluster, with its hyper links and content md5.
+        """
+        links_templates = set(helpers.get_url_template(link) for link in hyper_links_set)
+        with self._lock:
+            cluster = self._get_cluster(url)
+            cluster['testing_urls'].discard(url)
+            if url in cluster['sampled_urls']:
+                return
+            cluster['sampled_urls'].add(url)
+
+            is_duplicate = self.sample_by_md5 and md5 is not None and md5 in cluster['md5s']
+            if not is_duplicate and not links_templates.issubset(cluster['links_templates']):
+                cluster['unique_count'] += 1
+
+            cluster['links_templates'].update(links_templates)
+            if md5 is not None:
+                cluster['md5s'].add(md5)
+
+    def get_skipped_urls_count(self):
+        return sum(len(cluster['skipped_urls']) for cluster in self._clusters_dict.values())
+
+    def get_clusters_report(self):
+        """ get cluster level coverage, only clusters with crawled pages are included.
+        """
+        report = {}
+        for template, cluster in self._clusters_dict.items():
+            sampled_count = len(cluster['sampled_urls'])
+            if sampled_count == 0:
+                continue
+            skipped_count = len(cluster['skipped_urls'])
+            report[template] = {
+                'sampled': sampled_count,
+                'unique': cluster['unique_count'],
+                'skipped': skipped_count,
+                'coverage': round(float(sampled_count) / (sampled_count + skipped_count), 4)
+            }
+        return report